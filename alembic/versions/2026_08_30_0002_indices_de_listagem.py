@@ -0,0 +1,42 @@
+"""add indexes for listing queries
+
+Revision ID: 2026_08_30_0002
+Revises: 2024_10_17_0001
+Create Date: 2026-08-30
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_08_30_0002"
+down_revision = "2024_10_17_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Atende listar_ultimas_por_device: filtro por device_id com
+    # ORDER BY id DESC LIMIT n vira uma leitura direta do índice,
+    # sem buscar todas as linhas do dispositivo para ordenar depois.
+    op.create_index(
+        "ix_medicoes_device_id_id_desc",
+        "medicoes",
+        ["device_id", sa.text("id DESC")],
+        unique=False,
+    )
+    # Atende listar_por_measurement (keyset): o seek por
+    # (measurement_id, timestamp, id) casa exatamente com a ordem
+    # das colunas do índice.
+    op.create_index(
+        "ix_medicoes_measure_ts_id",
+        "medicoes",
+        ["measurement_id", "timestamp", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_medicoes_measure_ts_id", table_name="medicoes")
+    op.drop_index("ix_medicoes_device_id_id_desc", table_name="medicoes")
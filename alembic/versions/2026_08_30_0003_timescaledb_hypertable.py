@@ -0,0 +1,87 @@
+"""convert medicoes to a timescaledb hypertable with compression
+
+Revision ID: 2026_08_30_0003
+Revises: 2026_08_30_0002
+Create Date: 2026-08-30
+
+A tabela 'medicoes' é uma série temporal clássica (timestamp + dimensões
+device/measurement + valor float) crescendo sem limite. Como tabela plana
+do PostgreSQL, consultas por faixa de tempo degradam linearmente e o
+armazenamento cresce sem compressão. Esta migração converte para um
+hypertable do TimescaleDB particionado por 'timestamp', com compressão
+colunar nativa após 7 dias.
+
+A migração só tem efeito em PostgreSQL com a extensão timescaledb
+disponível; em SQLite (testes/dev) e em Postgres sem a extensão ela é um
+no-op, para que o restante do projeto continue portável.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_08_30_0003"
+down_revision = "2026_08_30_0002"
+branch_labels = None
+depends_on = None
+
+
+def _timescaledb_disponivel(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    disponivel = conn.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb'")
+    ).scalar()
+    return disponivel is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _timescaledb_disponivel(conn):
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+
+    # Hypertables exigem que toda constraint única inclua a coluna de
+    # particionamento; a PK passa de (id) para (id, timestamp).
+    op.execute("ALTER TABLE medicoes DROP CONSTRAINT medicoes_pkey")
+    op.execute("ALTER TABLE medicoes ADD PRIMARY KEY (id, timestamp)")
+
+    op.execute(
+        "SELECT create_hypertable("
+        "'medicoes', 'timestamp', "
+        "chunk_time_interval => INTERVAL '1 day', "
+        "migrate_data => TRUE)"
+    )
+
+    # Compressão colunar: segmenta por device/grandeza (as dimensões de
+    # consulta) e ordena por timestamp DESC dentro de cada segmento.
+    op.execute(
+        "ALTER TABLE medicoes SET ("
+        "timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'device_id,measurement_id', "
+        "timescaledb.compress_orderby = 'timestamp DESC')"
+    )
+    op.execute("SELECT add_compression_policy('medicoes', INTERVAL '7 days')")
+
+    # O hypertable cria índices por chunk em (timestamp DESC);
+    # o índice simples de timestamp fica redundante.
+    op.execute("DROP INDEX IF EXISTS ix_medicoes_timestamp")
+
+
+def downgrade():
+    conn = op.get_bind()
+    if not _timescaledb_disponivel(conn):
+        return
+
+    op.execute("SELECT remove_compression_policy('medicoes', if_exists => TRUE)")
+    op.execute("ALTER TABLE medicoes SET (timescaledb.compress = FALSE)")
+    op.create_index("ix_medicoes_timestamp", "medicoes", ["timestamp"], unique=False)
+    # Não há caminho nativo de "des-hypertable"; recria como tabela plana.
+    op.execute("CREATE TABLE medicoes_plana (LIKE medicoes INCLUDING ALL)")
+    op.execute("INSERT INTO medicoes_plana SELECT * FROM medicoes")
+    op.execute("DROP TABLE medicoes")
+    op.execute("ALTER TABLE medicoes_plana RENAME TO medicoes")
+    op.execute("ALTER TABLE medicoes DROP CONSTRAINT medicoes_plana_pkey")
+    op.execute("ALTER TABLE medicoes ADD PRIMARY KEY (id)")
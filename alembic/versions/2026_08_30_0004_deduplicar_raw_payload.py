@@ -0,0 +1,37 @@
+"""deduplicate raw_payload into raw_payloads table
+
+Revision ID: 2026_08_30_0004
+Revises: 2026_08_30_0003
+Create Date: 2026-08-30
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_08_30_0004"
+down_revision = "2026_08_30_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "raw_payloads",
+        sa.Column("hash", sa.String(length=64), primary_key=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+    )
+    # O conteúdo antigo de raw_payload não é migrado: era redundante
+    # (a mesma string repetida por medição) e serve só para auditoria.
+    op.drop_column("medicoes", "raw_payload")
+    op.add_column(
+        "medicoes",
+        sa.Column("raw_payload_hash", sa.String(length=64), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("medicoes", "raw_payload_hash")
+    op.add_column("medicoes", sa.Column("raw_payload", sa.Text(), nullable=True))
+    op.drop_table("raw_payloads")
@@ -0,0 +1,29 @@
+"""drop redundant device_id single-column index
+
+Revision ID: 2026_08_30_0005
+Revises: 2026_08_30_0004
+Create Date: 2026-08-30
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_08_30_0005"
+down_revision = "2026_08_30_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ix_medicoes_device_id é prefixo do composto
+    # ix_medicoes_device_measure_ts(device_id, measurement_id, timestamp):
+    # toda consulta que o usaria é atendida pelo composto. Mantê-lo só
+    # adiciona manutenção de B-tree em cada insert.
+    op.drop_index("ix_medicoes_device_id", table_name="medicoes")
+
+
+def downgrade():
+    op.create_index(
+        "ix_medicoes_device_id", "medicoes", ["device_id"], unique=False
+    )
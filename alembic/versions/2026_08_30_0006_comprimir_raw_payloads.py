@@ -0,0 +1,47 @@
+"""compress raw payload blobs with zstd
+
+Revision ID: 2026_08_30_0006
+Revises: 2026_08_30_0005
+Create Date: 2026-08-30
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_08_30_0006"
+down_revision = "2026_08_30_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Text → BYTEA: blobs novos passam a ser gravados comprimidos com
+    # zstd. Linhas existentes viram bytes não comprimidos — um frame
+    # zstd sempre começa com o magic 0x28B52FFD, então leitores
+    # conseguem distinguir os dois formatos sem recomprimir o histórico.
+    #
+    # batch_alter_table mantém a cadeia portável: no PostgreSQL vira o
+    # ALTER COLUMN ... TYPE normal; no SQLite (testes/dev), que não tem
+    # ALTER COLUMN TYPE, recria a tabela copiando os dados.
+    with op.batch_alter_table("raw_payloads") as batch_op:
+        batch_op.alter_column(
+            "payload",
+            type_=sa.LargeBinary(),
+            existing_type=sa.Text(),
+            existing_nullable=False,
+            postgresql_using="convert_to(payload, 'UTF8')",
+        )
+
+
+def downgrade():
+    # Só é reversível sem perda se nenhum blob comprimido foi gravado.
+    with op.batch_alter_table("raw_payloads") as batch_op:
+        batch_op.alter_column(
+            "payload",
+            type_=sa.Text(),
+            existing_type=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using="convert_from(payload, 'UTF8')",
+        )
@@ -11,40 +11,103 @@ Rotas principais:
 - GET /dispositivos
 """
 
-from fastapi import FastAPI, Query
+from datetime import datetime
 from typing import List, Optional
 
+from typing import AsyncIterator
+
+from fastapi import Depends, FastAPI, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from mqtt_data_bridge.database.modelagem_banco import AsyncSessionLocal, async_engine
 from mqtt_data_bridge.database.repositorio import MedicaoRepositorio
-from mqtt_data_bridge.api.schemas import MedicaoOut, DispositivoOut
+from mqtt_data_bridge.config.settings import settings
+from mqtt_data_bridge.utils.cache import (
+    CHAVE_DISPOSITIVOS,
+    PREFIXO_MEDICOES,
+    obter_cache_api,
+)
+from mqtt_data_bridge.api.schemas import (
+    CursorSerie,
+    DispositivoOut,
+    MedicaoOut,
+    SerieOut,
+)
+
+# Serializa listas de medições em duas chamadas nativas do pydantic-core
+# (validação em lote + dump_json em lote), em vez de um
+# MedicaoOut.model_validate(...) por linha em loop Python — faz diferença
+# nas rotas que retornam centenas/milhares de pontos.
+_MEDICOES_OUT_ADAPTER = TypeAdapter(List[MedicaoOut])
+
+
+def _serializar_medicoes(medicoes) -> bytes:
+    """
+    Converte uma lista de objetos Medicao (ORM) em JSON (bytes).
+    """
+    validadas = _MEDICOES_OUT_ADAPTER.validate_python(
+        medicoes, from_attributes=True
+    )
+    return _MEDICOES_OUT_ADAPTER.dump_json(validadas)
+
 
 app = FastAPI(
     title="mqtt-data-bridge API",
     version="0.1.0",
     description="API de leitura das medições armazenadas pelo mqtt-data-bridge.",
+    # orjson serializa as listas de medições bem mais rápido que o
+    # json padrão — é o maior custo de CPU dos endpoints de leitura.
+    default_response_class=ORJSONResponse,
 )
 
 
-def get_repositorio() -> MedicaoRepositorio:
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    Dependência FastAPI: uma sessão assíncrona por request.
+
+    Todas as consultas do request compartilham a mesma sessão (e portanto
+    um único checkout de conexão do pool); a sessão é fechada quando a
+    resposta termina.
     """
-    Factory simples para criar o repositório.
+    async with AsyncSessionLocal() as sessao:
+        yield sessao
 
-    Em projetos maiores, poderíamos usar injeção de dependência mais sofisticada,
-    mas aqui é suficiente criar uma instância por requisição.
+
+def get_repositorio(
+    sessao: AsyncSession = Depends(get_session),
+) -> MedicaoRepositorio:
+    """
+    Dependência FastAPI: repositório ligado à sessão do request.
     """
-    return MedicaoRepositorio()
+    return MedicaoRepositorio(sessao)
 
 
 # ------------------- HEALTHCHECK ------------------- #
 
 
 @app.get("/ping")
-def ping():
+async def ping():
     """
     Endpoint simples para healthcheck.
     """
     return {"status": "ok"}
 
 
+@app.get("/debug/pool")
+async def status_pool():
+    """
+    Exibe o estado atual do pool de conexões do engine assíncrono.
+
+    Útil para diagnosticar saturação de pool (checked-out vs overflow)
+    sob carga, sem precisar anexar um profiler ao processo.
+    """
+    return {"pool": async_engine.pool.status()}
+
+
 # ------------------- MEDIÇÕES ------------------- #
 
 
@@ -53,15 +116,31 @@ def ping():
     response_model=List[MedicaoOut],
     summary="Lista as últimas medições",
 )
-def listar_medicoes_recentes(
+async def listar_medicoes_recentes(
     limite: int = Query(100, ge=1, le=1000, description="Quantidade de medições"),
+    repo: MedicaoRepositorio = Depends(get_repositorio),
 ):
     """
     Retorna as últimas `limite` medições registradas no banco.
+
+    Cache-aside: resposta cacheada por CACHE_TTL_MEDICOES segundos e
+    invalidada a cada flush do consumer.
     """
-    repo = get_repositorio()
-    medicoes = repo.listar_ultimas(limite=limite)
-    return medicoes
+    cache = obter_cache_api()
+    chave = f"{PREFIXO_MEDICOES}recentes:{limite}"
+
+    if cache is not None:
+        cacheado = await cache.obter(chave)
+        if cacheado is not None:
+            return Response(cacheado, media_type="application/json")
+
+    medicoes = await repo.listar_ultimas(limite=limite)
+    corpo = _serializar_medicoes(medicoes)
+
+    if cache is not None:
+        await cache.definir(chave, corpo, settings.CACHE_TTL_MEDICOES)
+
+    return Response(corpo, media_type="application/json")
 
 
 @app.get(
@@ -69,24 +148,24 @@ def listar_medicoes_recentes(
     response_model=List[MedicaoOut],
     summary="Lista as últimas medições de um dispositivo",
 )
-def listar_medicoes_por_device(
+async def listar_medicoes_por_device(
     device_id: str,
     limite: int = Query(100, ge=1, le=1000, description="Quantidade de medições"),
+    repo: MedicaoRepositorio = Depends(get_repositorio),
 ):
     """
     Retorna as últimas medições de um dispositivo específico.
     """
-    repo = get_repositorio()
-    medicoes = repo.listar_ultimas_por_device(device_id=device_id, limite=limite)
-    return medicoes
+    medicoes = await repo.listar_ultimas_por_device(device_id=device_id, limite=limite)
+    return Response(_serializar_medicoes(medicoes), media_type="application/json")
 
 
 @app.get(
     "/serie/{measurement_id}",
-    response_model=List[MedicaoOut],
+    response_model=SerieOut,
     summary="Retorna série temporal para um measurementId",
 )
-def listar_serie_por_measurement(
+async def listar_serie_por_measurement(
     measurement_id: str,
     device_id: Optional[str] = Query(
         None, description="Opcional: filtra por device_id"
@@ -97,18 +176,77 @@ def listar_serie_por_measurement(
         le=5000,
         description="Máximo de pontos retornados",
     ),
+    after_ts: Optional[datetime] = Query(
+        None, description="Cursor: timestamp da última medição recebida"
+    ),
+    after_id: Optional[int] = Query(
+        None, description="Cursor: id da última medição recebida"
+    ),
+    repo: MedicaoRepositorio = Depends(get_repositorio),
 ):
     """
-    Retorna uma série temporal para um measurementId,
+    Retorna uma página de série temporal para um measurementId,
     opcionalmente filtrando por device_id.
+
+    A paginação é por keyset: repasse `next_cursor.after_ts` e
+    `next_cursor.after_id` da resposta anterior para buscar a próxima
+    página, em vez de usar OFFSET.
     """
-    repo = get_repositorio()
-    medicoes = repo.listar_por_measurement(
+    medicoes = await repo.listar_por_measurement(
         measurement_id=measurement_id,
         device_id=device_id,
         limite=limite,
+        after_ts=after_ts,
+        after_id=after_id,
     )
-    return medicoes
+
+    next_cursor = None
+    if len(medicoes) == limite:
+        ultima = medicoes[-1]
+        next_cursor = CursorSerie(after_ts=ultima.timestamp, after_id=ultima.id)
+
+    return SerieOut(
+        itens=[MedicaoOut.model_validate(m) for m in medicoes],
+        next_cursor=next_cursor,
+    )
+
+
+@app.get(
+    "/serie/{measurement_id}/stream",
+    summary="Transmite série temporal como NDJSON",
+)
+async def stream_serie_por_measurement(
+    measurement_id: str,
+    device_id: Optional[str] = Query(
+        None, description="Opcional: filtra por device_id"
+    ),
+    limite: int = Query(
+        5000,
+        ge=1,
+        le=50000,
+        description="Máximo de pontos transmitidos",
+    ),
+    repo: MedicaoRepositorio = Depends(get_repositorio),
+):
+    """
+    Transmite a série temporal como NDJSON (uma medição por linha).
+
+    Diferente de /serie/{measurement_id}, as linhas são enviadas conforme
+    saem do banco (cursor com yield_per), sem materializar a resposta
+    inteira em memória — melhor TTFB e pico de RAM para limites grandes.
+    """
+
+    async def gerar():
+        async for m in repo.stream_por_measurement(
+            measurement_id=measurement_id,
+            device_id=device_id,
+            limite=limite,
+        ):
+            yield orjson.dumps(
+                MedicaoOut.model_validate(m).model_dump(mode="json")
+            ) + b"\n"
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
 
 
 # ------------------- DISPOSITIVOS ------------------- #
@@ -119,10 +257,28 @@ def listar_serie_por_measurement(
     response_model=List[DispositivoOut],
     summary="Lista dispositivos conhecidos",
 )
-def listar_dispositivos():
+async def listar_dispositivos(
+    repo: MedicaoRepositorio = Depends(get_repositorio),
+):
     """
     Retorna a lista de device_id distintos presentes na base.
+
+    Cache-aside com TTL longo (CACHE_TTL_DISPOSITIVOS): a lista de
+    dispositivos muda raramente em relação à taxa de consultas.
     """
-    repo = get_repositorio()
-    ids = repo.listar_dispositivos()
-    return [DispositivoOut(device_id=d) for d in ids]
+    cache = obter_cache_api()
+
+    if cache is not None:
+        cacheado = await cache.obter(CHAVE_DISPOSITIVOS)
+        if cacheado is not None:
+            return Response(cacheado, media_type="application/json")
+
+    ids = await repo.listar_dispositivos()
+    payload = [{"device_id": d} for d in ids]
+
+    if cache is not None:
+        await cache.definir(
+            CHAVE_DISPOSITIVOS, orjson.dumps(payload), settings.CACHE_TTL_DISPOSITIVOS
+        )
+
+    return payload
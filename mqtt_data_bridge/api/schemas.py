@@ -7,6 +7,8 @@ para conversão via from_attributes.
 """
 
 from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, ConfigDict
 
 
@@ -25,6 +27,29 @@ class MedicaoOut(BaseModel):
     value: float
 
 
+class CursorSerie(BaseModel):
+    """
+    Cursor de paginação por keyset para a rota de série temporal.
+
+    Aponta para a última medição da página atual; o cliente repassa os
+    dois campos como `after_ts`/`after_id` para obter a página seguinte.
+    """
+
+    after_ts: datetime
+    after_id: int
+
+
+class SerieOut(BaseModel):
+    """
+    Página de uma série temporal, com cursor para a próxima página.
+
+    `next_cursor` é None quando não há mais páginas.
+    """
+
+    itens: List[MedicaoOut]
+    next_cursor: Optional[CursorSerie] = None
+
+
 class DispositivoOut(BaseModel):
     """
     Representa um dispositivo (apenas o ID) retornado pela API.
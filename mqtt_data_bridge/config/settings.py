@@ -17,7 +17,7 @@ from functools import lru_cache
 from typing import List
 
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -43,6 +43,16 @@ class Settings(BaseSettings):
         description="String de conexão do banco de dados (SQLAlchemy).",
     )
 
+    DB_POOL_SIZE: int = Field(
+        10,
+        description="Quantidade de conexões mantidas no pool do engine async.",
+    )
+
+    DB_MAX_OVERFLOW: int = Field(
+        20,
+        description="Conexões extras permitidas além do pool em picos de carga.",
+    )
+
     # ---------------------------------------------------------
     # MQTT — BROKER
     # ---------------------------------------------------------
@@ -73,6 +83,31 @@ class Settings(BaseSettings):
         description="Backoff inicial (segundos) entre tentativas de conexão MQTT.",
     )
 
+    MQTT_MAX_INFLIGHT_MESSAGES: int = Field(
+        1000,
+        description=(
+            "Janela de mensagens QoS>0 em trânsito no cliente paho "
+            "(max_inflight_messages_set)."
+        ),
+    )
+
+    MQTT_MAX_QUEUED_MESSAGES: int = Field(
+        100_000,
+        description=(
+            "Fila interna de saída do cliente paho antes de descartar "
+            "(max_queued_messages_set; 0 = ilimitado)."
+        ),
+    )
+
+    MQTT_SHARED_SUBSCRIPTION_GROUP: str = Field(
+        "",
+        description=(
+            "Grupo de assinatura compartilhada MQTT v5 ($share/<grupo>/...). "
+            "Vazio desabilita; preenchido, várias instâncias do consumer "
+            "dividem o fan-in do tópico."
+        ),
+    )
+
     # ---------------------------------------------------------
     # CONSUMER MQTT
     # ---------------------------------------------------------
@@ -91,6 +126,23 @@ class Settings(BaseSettings):
         description="Quantidade de registros por commit (inserts em batch).",
     )
 
+    DB_FLUSH_LINGER_MS: int = Field(
+        500,
+        description=(
+            "Latência máxima (ms) até um flush no banco, mesmo com o buffer "
+            "abaixo de BATCH_SIZE. Evita que tópicos de baixa taxa esperem "
+            "indefinidamente."
+        ),
+    )
+
+    DB_COPY_THRESHOLD: int = Field(
+        500,
+        description=(
+            "A partir deste tamanho de batch, usa COPY FROM STDIN "
+            "(PostgreSQL/psycopg) em vez de INSERT executemany."
+        ),
+    )
+
     # ---------------------------------------------------------
     # SIMULADOR MQTT
     # ---------------------------------------------------------
@@ -117,6 +169,38 @@ class Settings(BaseSettings):
         description="Prefixo do deviceId usado pelos simuladores.",
     )
 
+    SIMULATOR_BATCH_TICKS: int = Field(
+        1,
+        description=(
+            "Rodadas de geração acumuladas antes de publicar: as medições "
+            "de todos os dispositivos viajam em uma única mensagem MQTT "
+            "a cada SIMULATOR_BATCH_TICKS ticks."
+        ),
+    )
+
+    # ---------------------------------------------------------
+    # CACHE (REDIS)
+    # ---------------------------------------------------------
+    CACHE_ENABLED: bool = Field(
+        False,
+        description="Habilita o cache Redis nos endpoints de leitura da API.",
+    )
+
+    REDIS_URL: str = Field(
+        "redis://localhost:6379/0",
+        description="URL de conexão do Redis usado como cache.",
+    )
+
+    CACHE_TTL_MEDICOES: int = Field(
+        5,
+        description="TTL (segundos) do cache das rotas de medições.",
+    )
+
+    CACHE_TTL_DISPOSITIVOS: int = Field(
+        600,
+        description="TTL (segundos) do cache da rota de dispositivos.",
+    )
+
     # ---------------------------------------------------------
     # LOGGING
     # ---------------------------------------------------------
@@ -153,23 +237,24 @@ class Settings(BaseSettings):
         description="Backoff inicial (segundos) para repetir publicação MQTT.",
     )
 
-    class Config:
-        """
-        Config interna do Pydantic para a classe Settings.
-
-        - env_file: indica que, em ambiente de desenvolvimento, deve ler
-          automaticamente o arquivo .env (se existir).
-        - env_file_encoding: encoding do arquivo .env.
-        """
-
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    # Configuração no formato do pydantic-settings v2 (SettingsConfigDict):
+    # - env_file: em desenvolvimento, lê automaticamente o arquivo .env.
+    # - env_file_encoding: encoding do arquivo .env.
+    # - frozen: a instância é imutável após a construção — as leituras de
+    #   atributo viram acessos diretos, sem risco de alguém alterar a
+    #   configuração em runtime.
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        frozen=True,
+    )
 
     # ---------------------------------------------------------
     # VALIDADORES — VERSÃO PYDANTIC V2
     # ---------------------------------------------------------
 
     @field_validator("SIMULATOR_MEASUREMENT_IDS", mode="before")
+    @classmethod
     def split_measurement_ids(cls, v):
         """
         Converte 'pAcGrid,vAcGrid,iAcGrid' → ['pAcGrid','vAcGrid','iAcGrid']
@@ -180,6 +265,7 @@ class Settings(BaseSettings):
         return v
 
     @field_validator("LOG_LEVEL")
+    @classmethod
     def normalize_log_level(cls, v: str) -> str:
         """
         Normaliza nível de log (p.ex., "info" → "INFO") e garante valores válidos.
@@ -5,7 +5,7 @@ Schemas Pydantic para validação do payload MQTT.
 Compatível com Pydantic v2.
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class MedicaoMensagem(BaseModel):
@@ -23,6 +23,11 @@ class MedicaoMensagem(BaseModel):
         }
     """
 
+    # frozen: instâncias imutáveis são mais baratas de alocar e dispensam
+    # a maquinaria de validate_assignment; extra="ignore" descarta campos
+    # desconhecidos do payload sem custo de validação adicional.
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     timestamp: int
     deviceId: str
     measurementId: str
@@ -9,96 +9,347 @@ Objetivos:
 - Facilitar testes unitários (podemos mockar o repositório).
 """
 
-from typing import Iterable, List
-from sqlalchemy import select, func
+import io
+from contextlib import asynccontextmanager
+
+import zstandard
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
-from mqtt_data_bridge.database.modelagem_banco import criar_sessao, Medicao
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from mqtt_data_bridge.config.settings import settings
+from mqtt_data_bridge.database.modelagem_banco import (
+    criar_sessao,
+    criar_sessao_async,
+    Medicao,
+    RawPayload,
+)
+from mqtt_data_bridge.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Compressor zstd reutilizado pelos flushes (nível 3: bom equilíbrio
+# entre razão e CPU para JSON de telemetria). Usado só pela thread de
+# flush do consumer — sem acesso concorrente.
+_ZSTD = zstandard.ZstdCompressor(level=3)
+
+
+# "Loose index scan" para listar os device_id distintos: em vez de
+# SELECT DISTINCT (que varre a tabela inteira), a CTE recursiva salta de
+# um device_id para o próximo usando o índice — O(K log N) para K
+# dispositivos distintos, independente do número de medições.
+_SQL_DISPOSITIVOS_DISTINTOS = text(
+    """
+    WITH RECURSIVE dispositivos(device_id) AS (
+        SELECT MIN(device_id) FROM medicoes
+        UNION ALL
+        SELECT (
+            SELECT MIN(device_id)
+            FROM medicoes
+            WHERE device_id > dispositivos.device_id
+        )
+        FROM dispositivos
+        WHERE dispositivos.device_id IS NOT NULL
+    )
+    SELECT device_id
+    FROM dispositivos
+    WHERE device_id IS NOT NULL
+    """
+)
+
+# Tamanho máximo de cada executemany/COPY dentro de um batch: mantém o
+# working-set limitado mesmo quando o chamador passa um gerador enorme.
+_TAMANHO_LOTE_INSERT = 1000
+
+
+def _escapar_copy(valor: str) -> str:
+    """
+    Escapa um campo texto para o formato text do COPY.
+
+    Backslash, tab, newline e carriage return são os únicos caracteres
+    especiais do formato: sem o escape, um tab em um campo desloca todas
+    as colunas da linha e um device_id literal "\\N" viraria NULL.
+    """
+    return (
+        valor.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
 
 class MedicaoRepositorio:
     """
     Repositório responsável por operações de escrita
     relacionadas à entidade Medicao.
+
+    Para leitura (API), recebe uma AsyncSession injetada por request via
+    FastAPI Depends: todas as consultas de um mesmo request compartilham
+    uma única sessão/conexão, em vez de cada método abrir a sua. Sem
+    sessão injetada (ex.: consumer), cada método de leitura abre e fecha
+    a própria sessão, como antes.
     """
+
+    def __init__(self, sessao: Optional[AsyncSession] = None):
+        self._sessao = sessao
+
+    @asynccontextmanager
+    async def _sessao_escopo(self):
+        """
+        Entrega a sessão injetada (sem fechá-la — quem injetou gerencia o
+        ciclo de vida) ou abre uma sessão própria descartável.
+        """
+        if self._sessao is not None:
+            yield self._sessao
+        else:
+            async with criar_sessao_async() as sessao:
+                yield sessao
+
     # ---------------- GRAVAÇÃO ---------------- #
 
-    def salvar_em_batch(self, medicoes: Iterable[Medicao]) -> int:
+    def salvar_em_batch(
+        self,
+        medicoes: Iterable[dict],
+        payloads: dict[str, bytes] | None = None,
+        sessao=None,
+    ) -> int:
         """
-        Salva uma coleção de objetos Medicao em uma única transação.
+        Salva uma coleção de medições (dicts de colunas) em uma única transação.
 
         Parâmetros:
-            medicoes: coleção (lista, tupla, gerador) de instâncias de Medicao.
+            medicoes: coleção (lista, tupla, gerador) de dicts no formato
+                das colunas da tabela 'medicoes' (device_id, measurement_id,
+                measurement_index, timestamp, value, raw_payload_hash).
+            payloads: opcional, payloads brutos deduplicados
+                {hash: json_bruto_em_bytes} a gravar (comprimidos) na
+                tabela 'raw_payloads'.
+            sessao: opcional, Session síncrona a reutilizar. Quando
+                informada, o commit/rollback acontece nela mas ela NÃO é
+                fechada — o chamador é dono do ciclo de vida (permite ao
+                consumer manter uma sessão viva entre flushes, sem pagar
+                checkout de conexão e setup por batch).
 
         Retorna:
-            Quantidade de registros efetivamente persistidos.
+            Quantidade de medições efetivamente persistidas.
 
         Comportamento:
-            - Abre uma nova sessão.
-            - Adiciona todas as instâncias ao contexto.
-            - Faz commit se tudo der certo.
+            - Usa INSERT via SQLAlchemy Core (executemany), sem passar pelo
+              unit-of-work do ORM: uma ida ao banco por lote de até
+              _TAMANHO_LOTE_INSERT linhas, sem RETURNING de autoincrement
+              nem rastreamento de atributos.
+            - A entrada é consumida em streaming: um gerador grande nunca
+              é materializado por inteiro, só o lote corrente fica em
+              memória.
+            - Payloads brutos são gravados antes, pulando hashes que já
+              existem na tabela (dedup entre flushes).
+            - Faz commit se tudo der certo (transação única para todos
+              os lotes).
             - Em caso de erro, faz rollback e relança a exceção.
         """
-        medicoes = list(medicoes)  # garante que podemos medir o tamanho
-        if not medicoes:
-            return 0
-
-        sessao = criar_sessao()
+        sessao_propria = sessao is None
+        if sessao_propria:
+            sessao = criar_sessao()
         try:
-            sessao.add_all(medicoes)
+            if payloads:
+                self._salvar_payloads(sessao, payloads)
+
+            total = 0
+            lote: List[dict] = []
+            for medicao in medicoes:
+                lote.append(medicao)
+                if len(lote) >= _TAMANHO_LOTE_INSERT:
+                    self._gravar_lote(sessao, lote)
+                    total += len(lote)
+                    lote.clear()
+
+            if lote:
+                self._gravar_lote(sessao, lote)
+                total += len(lote)
+
+            if total == 0 and not payloads:
+                return 0
+
             sessao.commit()
-            return len(medicoes)
+            return total
         except SQLAlchemyError as exc:
             sessao.rollback()
-            print(f"[REPOSITORIO] Erro ao salvar medicoes em batch: {exc}")
+            logger.error("Erro ao salvar medições em batch: %s", exc)
             raise
         finally:
-            sessao.close()
-    
+            if sessao_propria:
+                sessao.close()
+
+    def _gravar_lote(self, sessao, lote: List[dict]) -> None:
+        """
+        Grava um lote de linhas: COPY quando o lote é grande e o driver
+        suporta; caso contrário, INSERT executemany.
+        """
+        if len(lote) >= settings.DB_COPY_THRESHOLD and self._suporta_copy(sessao):
+            self._salvar_via_copy(sessao, lote)
+        else:
+            sessao.execute(Medicao.__table__.insert(), lote)
+
+    @staticmethod
+    def _suporta_copy(sessao) -> bool:
+        """
+        COPY FROM STDIN só está disponível em PostgreSQL (psycopg v2 ou v3).
+        """
+        return sessao.get_bind().dialect.driver in ("psycopg", "psycopg2")
+
+    @staticmethod
+    def _salvar_via_copy(sessao, medicoes: List[dict]) -> None:
+        """
+        Grava o batch com COPY medicoes FROM STDIN (protocolo de bulk load
+        do PostgreSQL) — 5-20× mais rápido que INSERT para batches grandes.
+
+        Usa a conexão da própria sessão, portanto participa da mesma
+        transação do restante do batch (commit/rollback em conjunto).
+        No psycopg v3 as linhas são escritas direto com write_row (que já
+        escapa os valores); no psycopg2, que não tem essa API, o lote é
+        serializado à mão no formato text do COPY — device_id e
+        measurement_id vêm de payloads MQTT e passam por _escapar_copy,
+        os demais campos são numéricos/isoformat e não contêm caracteres
+        especiais.
+        """
+        driver_conn = sessao.connection().connection.driver_connection
+        comando = (
+            "COPY medicoes (device_id, measurement_id, measurement_index, "
+            "timestamp, value, raw_payload_hash) FROM STDIN"
+        )
+        with driver_conn.cursor() as cur:
+            if hasattr(cur, "copy"):  # psycopg v3
+                with cur.copy(comando) as copy:
+                    for m in medicoes:
+                        copy.write_row(
+                            (
+                                m["device_id"],
+                                m["measurement_id"],
+                                m["measurement_index"],
+                                m["timestamp"],
+                                m["value"],
+                                m.get("raw_payload_hash"),
+                            )
+                        )
+            else:  # psycopg2
+                linhas = io.StringIO()
+                for m in medicoes:
+                    payload_hash = m.get("raw_payload_hash")
+                    linhas.write(
+                        "\t".join(
+                            (
+                                _escapar_copy(m["device_id"]),
+                                _escapar_copy(m["measurement_id"]),
+                                str(m["measurement_index"]),
+                                m["timestamp"].isoformat(),
+                                repr(m["value"]),
+                                payload_hash if payload_hash is not None else r"\N",
+                            )
+                        )
+                    )
+                    linhas.write("\n")
+                linhas.seek(0)
+                cur.copy_expert(comando, linhas)
+
+    @staticmethod
+    def _salvar_payloads(sessao, payloads: dict[str, bytes]) -> None:
+        """
+        Insere os payloads brutos cujo hash ainda não existe na tabela.
+
+        Roda dentro da mesma transação do batch de medições. O SELECT
+        prévio é só uma otimização (payloads já gravados nem chegam a ser
+        comprimidos); o dedup de verdade é o INSERT .. ON CONFLICT DO
+        NOTHING: com MQTT_SHARED_SUBSCRIPTION_GROUP há vários consumers
+        escrevendo, e dois deles podem passar pelo SELECT com o mesmo
+        hash ao mesmo tempo — sem o upsert, a violação de PK derrubaria o
+        batch inteiro do perdedor.
+
+        A compressão zstd acontece aqui, depois do dedup.
+        """
+        existentes = set(
+            sessao.execute(
+                select(RawPayload.hash).where(RawPayload.hash.in_(payloads))
+            ).scalars()
+        )
+        novos = [
+            {"hash": h, "payload": _ZSTD.compress(p)}
+            for h, p in payloads.items()
+            if h not in existentes
+        ]
+        if not novos:
+            return
+
+        dialeto = sessao.get_bind().dialect.name
+        if dialeto == "postgresql":
+            stmt = pg_insert(RawPayload.__table__).on_conflict_do_nothing(
+                index_elements=["hash"]
+            )
+        elif dialeto == "sqlite":
+            stmt = sqlite_insert(RawPayload.__table__).on_conflict_do_nothing(
+                index_elements=["hash"]
+            )
+        else:
+            # Dialeto sem ON CONFLICT: fica o INSERT simples (o SELECT
+            # acima cobre o caso de consumer único).
+            stmt = RawPayload.__table__.insert()
+        sessao.execute(stmt, novos)
+
     # ---------------- LEITURA ---------------- #
+    #
+    # Os métodos de leitura são assíncronos: a API (FastAPI) os chama com
+    # await, de modo que o I/O de banco não bloqueia o event loop nem ocupa
+    # threads do pool do Starlette. O caminho de gravação (consumer MQTT)
+    # continua síncrono, pois roda em thread própria do paho.
 
-    def listar_ultimas(self, limite: int = 100) -> List[Medicao]:
+    async def listar_ultimas(self, limite: int = 100) -> List[Medicao]:
         """
         Retorna as últimas 'limite' medições, ordenadas por id desc.
         """
-        sessao = criar_sessao()
-        try:
+        async with self._sessao_escopo() as sessao:
             stmt = (
                 select(Medicao)
                 .order_by(Medicao.id.desc())
                 .limit(limite)
             )
-            return list(sessao.execute(stmt).scalars().all())
-        finally:
-            sessao.close()
+            result = await sessao.execute(stmt)
+            return list(result.scalars().all())
 
-    def listar_ultimas_por_device(self, device_id: str, limite: int = 100) -> List[Medicao]:
+    async def listar_ultimas_por_device(self, device_id: str, limite: int = 100) -> List[Medicao]:
         """
         Retorna as últimas medições de um dispositivo específico.
         """
-        sessao = criar_sessao()
-        try:
+        async with self._sessao_escopo() as sessao:
             stmt = (
                 select(Medicao)
                 .where(Medicao.device_id == device_id)
                 .order_by(Medicao.id.desc())
                 .limit(limite)
             )
-            return list(sessao.execute(stmt).scalars().all())
-        finally:
-            sessao.close()
+            result = await sessao.execute(stmt)
+            return list(result.scalars().all())
 
-    def listar_por_measurement(
+    async def listar_por_measurement(
         self,
         measurement_id: str,
         device_id: str | None = None,
         limite: int = 500,
+        after_ts: datetime | None = None,
+        after_id: int | None = None,
     ) -> List[Medicao]:
         """
         Retorna uma série temporal para um measurementId,
         opcionalmente filtrado por device_id.
+
+        Paginação por keyset (seek): em vez de OFFSET, o chamador informa a
+        posição (timestamp, id) da última linha já vista e recebemos apenas
+        as linhas seguintes. Isso mantém a consulta em um seek no índice
+        composto, em vez de varrer e descartar as páginas anteriores.
         """
-        sessao = criar_sessao()
-        try:
+        async with self._sessao_escopo() as sessao:
             stmt = (
                 select(Medicao)
                 .where(Medicao.measurement_id == measurement_id)
@@ -107,21 +358,69 @@ class MedicaoRepositorio:
             if device_id:
                 stmt = stmt.where(Medicao.device_id == device_id)
 
-            # Aqui faz mais sentido ordenar por timestamp ascendente
-            stmt = stmt.order_by(Medicao.timestamp.asc()).limit(limite)
+            if after_ts is not None and after_id is not None:
+                # Forma reescrita de (timestamp, id) > (:ts, :id):
+                # o predicado redundante "timestamp >= :ts" permite ao
+                # planner usar o índice composto direto no seek.
+                stmt = stmt.where(
+                    and_(
+                        Medicao.timestamp >= after_ts,
+                        or_(
+                            Medicao.timestamp > after_ts,
+                            Medicao.id > after_id,
+                        ),
+                    )
+                )
 
-            return list(sessao.execute(stmt).scalars().all())
-        finally:
-            sessao.close()
+            # Ordenação estável: timestamp com 'id' como desempate, para o
+            # cursor (timestamp, id) ser determinístico mesmo com empates.
+            stmt = stmt.order_by(
+                Medicao.timestamp.asc(), Medicao.id.asc()
+            ).limit(limite)
+
+            result = await sessao.execute(stmt)
+            return list(result.scalars().all())
+
+    async def stream_por_measurement(
+        self,
+        measurement_id: str,
+        device_id: str | None = None,
+        limite: int = 5000,
+    ):
+        """
+        Itera uma série temporal sem materializar todas as linhas.
 
-    def listar_dispositivos(self) -> List[str]:
+        Variante de listar_por_measurement para respostas grandes: usa um
+        cursor de streaming (yield_per=500) e produz as medições uma a
+        uma, mantendo em memória apenas o lote corrente em vez das
+        'limite' linhas completas.
+        """
+        async with self._sessao_escopo() as sessao:
+            stmt = (
+                select(Medicao)
+                .where(Medicao.measurement_id == measurement_id)
+            )
+
+            if device_id:
+                stmt = stmt.where(Medicao.device_id == device_id)
+
+            stmt = (
+                stmt.order_by(Medicao.timestamp.asc(), Medicao.id.asc())
+                .limit(limite)
+                .execution_options(yield_per=500)
+            )
+
+            result = await sessao.stream_scalars(stmt)
+            async for medicao in result:
+                yield medicao
+
+    async def listar_dispositivos(self) -> List[str]:
         """
         Retorna a lista de device_id distintos presentes na tabela.
+
+        Usa a CTE recursiva _SQL_DISPOSITIVOS_DISTINTOS (loose index scan)
+        em vez de SELECT DISTINCT, que precisaria varrer todas as linhas.
         """
-        sessao = criar_sessao()
-        try:
-            stmt = select(func.distinct(Medicao.device_id))
-            result = sessao.execute(stmt).all()
-            return [row[0] for row in result]
-        finally:
-            sessao.close()
\ No newline at end of file
+        async with self._sessao_escopo() as sessao:
+            result = await sessao.execute(_SQL_DISPOSITIVOS_DISTINTOS)
+            return [row[0] for row in result.all()]
\ No newline at end of file
@@ -14,59 +14,309 @@ Neste momento, o foco é o esqueleto: estrutura do fluxo e pontos
 de integração. Otimizações (batch, backpressure, etc.) vêm depois.
 """
 
-import json
+import hashlib
+import logging
+import queue
+import threading
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+import orjson
 from paho.mqtt import client as mqtt
+from pydantic import TypeAdapter, ValidationError
 
 from mqtt_data_bridge.config.settings import settings
-from mqtt_data_bridge.database.modelagem_banco import Medicao
 from mqtt_data_bridge.core.schemas import MedicaoMensagem
+from mqtt_data_bridge.database.modelagem_banco import criar_sessao
 from mqtt_data_bridge.database.repositorio import MedicaoRepositorio
+from mqtt_data_bridge.utils.backoff import calcular_backoffs
+from mqtt_data_bridge.utils.cache import invalidar_cache_leituras
 from mqtt_data_bridge.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Valida a lista inteira de medições em uma única chamada ao núcleo do
+# Pydantic (pydantic-core, em Rust), em vez de um model_validate por item
+# em loop Python. Construído uma vez no import.
+_MEDICOES_ADAPTER = TypeAdapter(List[MedicaoMensagem])
+
+# Época Unix em UTC, pré-construída: converter epoch-ms somando um
+# timedelta é mais barato que datetime.fromtimestamp por linha (sem
+# divisão float nem anexação de tzinfo a cada chamada).
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Snapshot no import: Settings é frozen, então o valor nunca muda em
+# runtime e a leitura vira um acesso a global em vez de dois lookups de
+# atributo por mensagem.
+_SAVE_RAW_PAYLOAD = settings.SAVE_RAW_PAYLOAD
+
+# Esperas de retry de conexão, pré-computadas no import.
+_BACKOFFS_CONEXAO = calcular_backoffs(
+    settings.MQTT_CONNECT_BACKOFF_BASE, settings.MQTT_CONNECT_MAX_RETRIES
+)
+
 
 class MedicaoBuffer:
     """
     Buffer simples para acumular medições antes de gravar no banco.
 
-    - Acumula objetos Medicao (ORM).
+    - Acumula linhas prontas para INSERT (dicts com as colunas de 'medicoes').
     - Quando atinge BATCH_SIZE, dispara flush para o banco.
+
+    O armazenamento é uma lista de slots pré-alocada com batch_size
+    posições, preenchida por índice: em regime, nenhum flush realoca ou
+    redimensiona a lista (sem o crescimento amortizado de list.append
+    nem o descarte/realocação de list.clear por ciclo).
+
+    O trabalho de banco roda em uma thread dedicada de flush: a thread de
+    rede do paho apenas enfileira linhas (fila limitada — se o banco
+    atrasar, a fila enche e o put bloqueia, propagando backpressure para
+    o cliente MQTT em vez de acumular memória sem limite). A thread de
+    flush drena a fila e grava quando junta batch_size linhas OU quando a
+    linha mais antiga pendente completa DB_FLUSH_LINGER_MS, o que vier
+    primeiro — tópicos de baixa taxa não esperam indefinidamente e os
+    retries de banco nunca bloqueiam a leitura de pacotes MQTT.
     """
 
     def __init__(self, batch_size: int, repositorio: MedicaoRepositorio):
         self.batch_size = batch_size
-        self._buffer: List[Medicao] = []
+        self._slots: List[dict | None] = [None] * batch_size
+        self._n = 0
+        # Fila entre a thread do paho (produtor) e a de flush (consumidor).
+        # maxsize limitado = backpressure: 4 batches de folga.
+        self._fila: queue.Queue = queue.Queue(maxsize=batch_size * 4)
+        # Payloads brutos pendentes (bytes), deduplicados por hash: um
+        # payload com N medições entra aqui uma única vez, independente
+        # de N. A compressão fica a cargo do repositório, após o dedup.
+        self._payloads: dict[str, bytes] = {}
         self.repositorio = repositorio
 
-    def adicionar(self, medicao: Medicao):
-        self._buffer.append(medicao)
+        # Protege _payloads, tocado pela thread do paho (registrar) e pela
+        # de flush (gravar/limpar). Os slots são exclusivos da thread de
+        # flush — e de encerrar/flush, mas só depois do join.
+        self._lock = threading.RLock()
+        # Configurações lidas a cada flush, congeladas aqui como
+        # atributos (Settings é imutável; evita lookups repetidos).
+        self._linger_seconds = settings.DB_FLUSH_LINGER_MS / 1000.0
+        self._flush_backoffs = calcular_backoffs(
+            settings.DB_FLUSH_BACKOFF_BASE, settings.DB_FLUSH_MAX_RETRIES
+        )
+        self._parar = threading.Event()
+        self._flusher_thread: threading.Thread | None = None
+        # Sessão reutilizada entre flushes (criada sob demanda): evita
+        # abrir/fechar uma Session — e devolver a conexão ao pool — a
+        # cada batch. Só a thread de flush a utiliza.
+        self._sessao = None
+
+    def iniciar_flusher(self):
+        """
+        Inicia a thread dedicada de flush (tempo + tamanho).
+        """
+        if self._flusher_thread is not None:
+            return
+        self._flusher_thread = threading.Thread(
+            target=self._flusher_loop,
+            name="medicao-buffer-flusher",
+            daemon=True,
+        )
+        self._flusher_thread.start()
+
+    def encerrar(self):
+        """
+        Para a thread de flush e grava o que restou (fila + slots).
+        """
+        self._parar.set()
+        if self._flusher_thread is not None:
+            # Join SEM timeout: com o flag de parada setado o loop termina
+            # assim que o flush corrente (e seus backoffs) acabar. Um join
+            # com timeout podia expirar no meio de um retry e deixar o
+            # drain abaixo disputando _slots/_n/_sessao com a thread ainda
+            # viva — sem lock, com risco de gravação dupla do lote.
+            self._flusher_thread.join()
+            self._flusher_thread = None
+        self.flush()
+        self._fechar_sessao()
+
+    def _flusher_loop(self):
+        """
+        Loop da thread de flush.
+
+        'prazo' marca o deadline de linger da linha pendente mais antiga:
+        definido quando o primeiro item entra nos slots, zerado a cada
+        gravação. O get com timeout serve ao mesmo tempo de espera por
+        novas linhas e de relógio do linger.
+
+        A thread nunca pode morrer: se ela cair, a fila limitada enche e
+        ingerir passa a bloquear o loop de rede do paho para sempre. Por
+        isso o corpo inteiro roda sob um except genérico, e os slots só
+        recebem uma nova linha quando há espaço — _flush_com_retries
+        mantém o buffer cheio quando o banco fica fora do ar por mais
+        tempo que a escada de retries.
+        """
+        prazo: float | None = None
+        while True:
+            try:
+                if self._n >= self.batch_size:
+                    # Buffer cheio de um flush que falhou: para de drenar
+                    # a fila (backpressure até o paho) e só reinsiste na
+                    # gravação, no ritmo do linger, até abrir espaço.
+                    self._flush_com_retries()
+                    if self._n >= self.batch_size:
+                        if self._parar.wait(self._linger_seconds):
+                            # Encerramento: o drain final de flush() cuida
+                            # do que sobrou na fila e nos slots.
+                            return
+                        continue
+                    prazo = None
+
+                if prazo is None:
+                    timeout = self._linger_seconds
+                else:
+                    timeout = max(0.0, prazo - time.monotonic())
+                try:
+                    medicao = self._fila.get(timeout=timeout)
+                except queue.Empty:
+                    medicao = None
+
+                if medicao is not None:
+                    if prazo is None:
+                        prazo = time.monotonic() + self._linger_seconds
+                    self._slots[self._n] = medicao
+                    self._n += 1
+
+                if self._n >= self.batch_size or (
+                    self._n > 0
+                    and (medicao is None or time.monotonic() >= prazo)
+                ):
+                    self._flush_com_retries()
+                    # Se o flush falhou e as linhas ficaram retidas, o
+                    # prazo é rearmado para espaçar as reinsistências em
+                    # vez de martelar o banco a cada iteração.
+                    if self._n == 0:
+                        prazo = None
+                    else:
+                        prazo = time.monotonic() + self._linger_seconds
+
+                if medicao is None and self._parar.is_set() and self._fila.empty():
+                    return
+            except Exception:
+                logger.exception(
+                    "Erro inesperado na thread de flush; thread mantida viva."
+                )
+                # Pausa curta para um erro persistente não virar busy-loop.
+                if self._parar.wait(self._linger_seconds):
+                    return
+
+    def adicionar(self, medicao: dict):
+        # Bloqueia quando a fila está cheia: backpressure para o paho.
+        self._fila.put(medicao)
+
+    def ingerir(self, raw: bytes | str) -> int:
+        """
+        Caminho único de ingestão: converte o payload bruto e enfileira
+        as medições resultantes (registrando o payload deduplicado).
+
+        Funde o que on_message fazia em etapas — conversão, registro do
+        payload e N chamadas a adicionar — em um método só, sem
+        intermediários no caminho quente. Retorna quantas medições
+        entraram na fila.
+        """
+        medicoes = converter_payload_para_medicoes(raw)
+        if not medicoes:
+            return 0
+
+        if medicoes[0]["raw_payload_hash"] is not None:
+            # O payload segue como bytes até o banco: a tabela
+            # raw_payloads guarda o blob comprimido, sem decode algum.
+            payload = raw if isinstance(raw, bytes) else raw.encode("utf-8")
+            self.registrar_payload(medicoes[0]["raw_payload_hash"], payload)
+
+        _put = self._fila.put
+        for medicao in medicoes:
+            _put(medicao)
+        return len(medicoes)
+
+    def registrar_payload(self, payload_hash: str, payload: bytes):
+        """
+        Registra o payload bruto (deduplicado) para gravação no próximo flush.
+        """
+        with self._lock:
+            self._payloads[payload_hash] = payload
 
     def tamanho(self) -> int:
-        return len(self._buffer)
+        return self._n + self._fila.qsize()
 
     def flush(self):
         """
-        Envia o conteúdo do buffer para o banco, em uma transação.
-        Após sucesso, limpa o buffer.
+        Drena a fila e grava tudo que está pendente, de forma síncrona.
+
+        Só deve ser chamada com a thread de flush parada (encerramento)
+        ou nunca iniciada (testes) — os slots não são protegidos por lock.
         """
-        if not self._buffer:
+        while True:
+            try:
+                medicao = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if self._n >= self.batch_size:
+                self._flush_com_retries()
+                if self._n >= self.batch_size:
+                    # Banco indisponível até o fim dos retries: devolve a
+                    # linha à fila e interrompe o drain em vez de estourar
+                    # os slots. O que ficou na fila se perde junto com o
+                    # processo, mas o buffer permanece consistente.
+                    try:
+                        self._fila.put_nowait(medicao)
+                    except queue.Full:
+                        logger.error(
+                            "Fila cheia durante o drain final; 1 medição descartada."
+                        )
+                    logger.error(
+                        "Drain final interrompido: %s medições retidas nos slots "
+                        "e %s na fila não puderam ser gravadas.",
+                        self._n,
+                        self._fila.qsize(),
+                    )
+                    return
+            self._slots[self._n] = medicao
+            self._n += 1
+        self._flush_com_retries()
+
+    def _flush_com_retries(self):
+        if self._n == 0:
             return
 
-        delay = settings.DB_FLUSH_BACKOFF_BASE
-        max_retries = settings.DB_FLUSH_MAX_RETRIES
+        backoffs = self._flush_backoffs
+        max_retries = len(backoffs)
+        lote = self._slots[: self._n]
+        with self._lock:
+            payloads = dict(self._payloads)
 
-        for attempt in range(1, max_retries + 1):
+        for attempt, delay in enumerate(backoffs, start=1):
             try:
-                gravadas = self.repositorio.salvar_em_batch(self._buffer)
+                if self._sessao is None:
+                    self._sessao = criar_sessao()
+                gravadas = self.repositorio.salvar_em_batch(
+                    lote, payloads=payloads, sessao=self._sessao
+                )
                 logger.info("Gravadas %s medições no banco.", gravadas)
-                self._buffer.clear()
+                # "Limpar" é só rebobinar o cursor; os slots são anulados
+                # para liberar as referências aos dicts gravados.
+                self._slots[: self._n] = [None] * self._n
+                self._n = 0
+                with self._lock:
+                    for payload_hash in payloads:
+                        self._payloads.pop(payload_hash, None)
+                # Dados novos no banco: derruba as respostas cacheadas
+                # para a API não servir leituras defasadas até o TTL.
+                invalidar_cache_leituras()
                 return
             except Exception:
+                # Descarta a sessão reutilizada: se a conexão subjacente
+                # morreu, o retry recomeça com uma sessão (e conexão) nova.
+                self._fechar_sessao()
+
                 if attempt >= max_retries:
                     logger.exception(
                         "Falha ao salvar medições após %s tentativas; buffer será mantido.",
@@ -83,11 +333,28 @@ class MedicaoBuffer:
                     exc_info=True,
                 )
                 time.sleep(delay)
-                delay *= 2  # backoff exponencial
 
-def converter_payload_para_medicoes(raw_payload: str) -> List[Medicao]:
+    def _fechar_sessao(self):
+        if self._sessao is not None:
+            try:
+                self._sessao.close()
+            except Exception:
+                logger.warning("Erro ao fechar sessão do buffer.", exc_info=True)
+            self._sessao = None
+
+def converter_payload_para_medicoes(raw_payload: bytes | str) -> List[dict]:
     """
-    Converte a string JSON recebida via MQTT em uma lista de objetos Medicao.
+    Converte o JSON recebido via MQTT (bytes ou str) em uma lista de linhas
+    (dicts) prontas para INSERT na tabela 'medicoes'.
+
+    Aceitar bytes evita um decode UTF-8 por mensagem no caminho quente: o
+    pydantic-core e o orjson parseiam bytes diretamente, e o hash SHA-256
+    já trabalha sobre bytes.
+
+    Produzimos dicts em vez de objetos Medicao (ORM) de propósito: o caminho
+    de gravação usa INSERT em batch via SQLAlchemy Core (executemany), que
+    não precisa do unit-of-work do ORM e evita o custo por linha de
+    rastreamento de atributos.
 
     Regras:
     - Espera um JSON representando uma lista de objetos.
@@ -97,8 +364,65 @@ def converter_payload_para_medicoes(raw_payload: str) -> List[Medicao]:
     """
 
     try:
-        dados = json.loads(raw_payload)
-    except json.JSONDecodeError as exc:
+        # Caminho rápido: parse + validação da lista inteira em uma chamada
+        # nativa do pydantic-core, sem loop Python por item.
+        msgs = _MEDICOES_ADAPTER.validate_json(raw_payload)
+    except ValidationError:
+        # Caminho lento: algum item é inválido (ou o JSON não é uma lista).
+        # Revalida item a item para aproveitar os válidos e logar os demais.
+        msgs = _validar_itens_individualmente(raw_payload)
+
+    if not msgs:
+        return []
+
+    # Hash calculado uma única vez por mensagem MQTT (não por medição);
+    # o JSON bruto em si é gravado deduplicado na tabela raw_payloads.
+    if _SAVE_RAW_PAYLOAD:
+        dados = (
+            raw_payload
+            if isinstance(raw_payload, bytes)
+            else raw_payload.encode("utf-8")
+        )
+        payload_hash = hashlib.sha256(dados).hexdigest()
+    else:
+        payload_hash = None
+
+    medicoes: List[dict] = []
+
+    # Locais pré-resolvidos para o loop: evita repetir o lookup de
+    # atributo (descriptor) a cada medição.
+    _epoch = _EPOCH_UTC
+    _ms = timedelta
+
+    for msg in msgs:
+        # Converte epoch ms → datetime UTC (aritmética sobre a época
+        # pré-construída; ver _EPOCH_UTC)
+        ts = _epoch + _ms(milliseconds=msg.timestamp)
+
+        medicoes.append(
+            {
+                "device_id": msg.deviceId,
+                "measurement_id": msg.measurementId,
+                "measurement_index": msg.measurementIndex,
+                "timestamp": ts,
+                "value": msg.value,
+                "raw_payload_hash": payload_hash,
+            }
+        )
+
+    return medicoes
+
+
+def _validar_itens_individualmente(raw_payload: bytes | str) -> List[MedicaoMensagem]:
+    """
+    Fallback de validação: parseia o JSON e valida item a item.
+
+    Usado apenas quando a validação em lote falha — preserva a semântica
+    de "itens inválidos são ignorados, os válidos seguem adiante".
+    """
+    try:
+        dados = orjson.loads(raw_payload)
+    except orjson.JSONDecodeError as exc:
         logger.warning("Erro ao decodificar JSON: %s", exc)
         return []
 
@@ -106,68 +430,40 @@ def converter_payload_para_medicoes(raw_payload: str) -> List[Medicao]:
         logger.warning("Payload inválido: esperado uma lista de medições.")
         return []
 
-    medicoes: List[Medicao] = []
-
+    msgs: List[MedicaoMensagem] = []
     for item in dados:
         try:
-            # Validação e parsing via Pydantic (Pydantic v2)
-            msg = MedicaoMensagem.model_validate(item)
-        except Exception as exc:
+            msgs.append(MedicaoMensagem.model_validate(item))
+        except ValidationError as exc:
             logger.warning("Payload inválido para MedicaoMensagem: %s", exc)
-            continue
-
-        # Converte epoch ms → datetime UTC
-        ts = datetime.fromtimestamp(msg.timestamp / 1000.0, tz=timezone.utc)
-
-        medicao = Medicao(
-            device_id=msg.deviceId,
-            measurement_id=msg.measurementId,
-            measurement_index=msg.measurementIndex,
-            timestamp=ts,
-            value=msg.value,
-            raw_payload=raw_payload if settings.SAVE_RAW_PAYLOAD else None,
-        )
-
-        medicoes.append(medicao)
-
-    return medicoes
+    return msgs
 
 def on_message(client: mqtt.Client, userdata, msg: mqtt.MQTTMessage):
     """
     Callback chamada toda vez que uma mensagem é recebida.
 
-    - Decodifica o payload.
-    - Converte para objetos Medicao.
-    - Adiciona ao buffer.
-    - Faz flush se o tamanho do buffer atingir o BATCH_SIZE.
+    Delega tudo a buffer.ingerir: o payload (bytes, sem decode
+    intermediário) vira linhas de inserção já enfileiradas para a
+    thread de flush.
     """
     buffer: MedicaoBuffer = userdata["buffer"]
 
-    try:
-        payload_str = msg.payload.decode("utf-8")
-    except UnicodeDecodeError as exc:
-        logger.warning("Erro ao decodificar payload como UTF-8: %s", exc)
-        return
-
-    logger.debug("Mensagem recebida em %s: %s", msg.topic, payload_str)
-
-    medicoes = converter_payload_para_medicoes(payload_str)
+    # Guardado por isEnabledFor: em produção (INFO) a chamada de debug —
+    # e a montagem dos argumentos — nem acontece, por mensagem.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Mensagem recebida em %s: %s", msg.topic, msg.payload)
 
-    for medicao in medicoes:
-        buffer.adicionar(medicao)
-
-    if buffer.tamanho() >= settings.BATCH_SIZE:
-        buffer.flush()
+    buffer.ingerir(msg.payload)
 
 
 def _conectar_com_retries(client: mqtt.Client):
     """
-    Tenta conectar ao broker com retries e backoff exponencial.
+    Tenta conectar ao broker com retries e backoff exponencial
+    (sequência pré-computada em _BACKOFFS_CONEXAO).
     """
-    delay = settings.MQTT_CONNECT_BACKOFF_BASE
-    max_retries = settings.MQTT_CONNECT_MAX_RETRIES
+    max_retries = len(_BACKOFFS_CONEXAO)
 
-    for attempt in range(1, max_retries + 1):
+    for attempt, delay in enumerate(_BACKOFFS_CONEXAO, start=1):
         try:
             client.connect(
                 settings.MQTT_BROKER_HOST,
@@ -191,7 +487,6 @@ def _conectar_com_retries(client: mqtt.Client):
                 exc_info=True,
             )
             time.sleep(delay)
-            delay *= 2
 
 def criar_cliente_mqtt(buffer: MedicaoBuffer) -> mqtt.Client:
     """
@@ -202,17 +497,29 @@ def criar_cliente_mqtt(buffer: MedicaoBuffer) -> mqtt.Client:
     - Conecta ao broker com os parâmetros de settings.
     """
 
-    client = mqtt.Client()
-
-    def on_connect(client, userdata, flags, rc):
-        logger.info("Conectado ao broker MQTT. RC=%s", rc)
-        # Ao conectar, assinamos o root configurado
+    # MQTT v5 com a API de callbacks atual do paho 2.x. As janelas de
+    # inflight/fila saem dos defaults (20 / ilimitado-pequeno) para
+    # aguentar rajadas sem serializar o tratamento de acks.
+    client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2,
+        protocol=mqtt.MQTTv5,
+    )
+    client.max_inflight_messages_set(settings.MQTT_MAX_INFLIGHT_MESSAGES)
+    client.max_queued_messages_set(settings.MQTT_MAX_QUEUED_MESSAGES)
+
+    def on_connect(client, userdata, flags, reason_code, properties):
+        logger.info("Conectado ao broker MQTT. RC=%s", reason_code)
+        # Ao conectar, assinamos o root configurado. Com um grupo de
+        # assinatura compartilhada (MQTT v5), o broker distribui as
+        # mensagens entre as instâncias do consumer no mesmo grupo.
         topic_root = settings.MQTT_TOPIC_ROOT
-        client.subscribe(topic_root)
-        logger.info("Assinado tópico raiz: %s", topic_root)
+        grupo = settings.MQTT_SHARED_SUBSCRIPTION_GROUP
+        topico = f"$share/{grupo}/{topic_root}" if grupo else topic_root
+        client.subscribe(topico, qos=0)
+        logger.info("Assinado tópico raiz: %s", topico)
 
-    def on_disconnect(client, userdata, rc):
-        logger.warning("Desconectado do broker MQTT. RC=%s", rc)
+    def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
+        logger.warning("Desconectado do broker MQTT. RC=%s", reason_code)
 
     client.on_connect = on_connect
     client.on_disconnect = on_disconnect
@@ -241,6 +548,7 @@ def run_consumer():
         batch_size=settings.BATCH_SIZE,
         repositorio=repositorio,
     )
+    buffer.iniciar_flusher()
     client = criar_cliente_mqtt(buffer)
 
     logger.info(
@@ -256,6 +564,7 @@ def run_consumer():
     except KeyboardInterrupt:
         logger.info("Encerrando consumer (Ctrl+C).")
     finally:
+        buffer.encerrar()
         client.disconnect()
 
 
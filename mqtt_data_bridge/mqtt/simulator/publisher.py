@@ -14,18 +14,50 @@ garantir a estrutura e o fluxo, para depois refinarmos as regras
 de geração de dados.
 """
 
-import json
 import time
-import random
 from typing import List
 
+import numpy as np
+import orjson
 from paho.mqtt import client as mqtt
 
 from mqtt_data_bridge.config.settings import settings
+from mqtt_data_bridge.utils.backoff import calcular_backoffs
 from mqtt_data_bridge.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Esperas de retry pré-computadas no import (Settings é imutável).
+_BACKOFFS_CONEXAO = calcular_backoffs(
+    settings.MQTT_CONNECT_BACKOFF_BASE, settings.MQTT_CONNECT_MAX_RETRIES
+)
+_BACKOFFS_PUBLICACAO = calcular_backoffs(
+    settings.MQTT_PUBLISH_BACKOFF_BASE, settings.MQTT_PUBLISH_MAX_RETRIES
+)
+
+# Pool de valores aleatórios pré-gerado com NumPy: uma chamada
+# vetorizada (PCG64 em C) enche 65536 valores de uma vez, em vez de um
+# random.uniform — chamada Python pura — por medição por tick. O cursor
+# avança pelo pool e o regenera quando esgota.
+_RNG = np.random.default_rng()
+_POOL_TAMANHO = 65536
+_pool = _RNG.uniform(-1000.0, 1000.0, _POOL_TAMANHO)
+_pool_cursor = 0
+
+
+def _proximos_valores(n: int) -> List[float]:
+    """
+    Retorna os próximos n valores do pool (floats Python, via tolist).
+    """
+    global _pool, _pool_cursor
+    if _pool_cursor + n > _POOL_TAMANHO:
+        _pool = _RNG.uniform(-1000.0, 1000.0, _POOL_TAMANHO)
+        _pool_cursor = 0
+    valores = _pool[_pool_cursor:_pool_cursor + n]
+    _pool_cursor += n
+    return valores.tolist()
+
+
 class MQTTDeviceSimulator:
     """
     Representa um dispositivo simulado que publica medições em um tópico MQTT.
@@ -46,9 +78,22 @@ class MQTTDeviceSimulator:
         #   <deviceId>/data
         self.topic = f"{self.device_id}/data"
 
-    def gerar_payload(self) -> List[dict]:
+        # Template de payload pré-serializado: deviceId, measurementId e
+        # measurementIndex não mudam entre ticks, então o trecho JSON de
+        # cada medição é montado uma única vez aqui. Em gerar_payload
+        # resta concatenar timestamp e valor — sem dicts nem json.dumps
+        # por publicação. orjson.dumps garante o escaping correto dos ids.
+        device_json = orjson.dumps(self.device_id)
+        self._templates: List[bytes] = [
+            b',"deviceId":' + device_json
+            + b',"measurementId":' + orjson.dumps(measurement_id)
+            + b',"measurementIndex":1,"value":'
+            for measurement_id in self.measurement_ids
+        ]
+
+    def gerar_payload(self) -> bytes:
         """
-        Gera um payload canônico com uma ou mais medições.
+        Gera um payload canônico (JSON em bytes) com uma ou mais medições.
 
         Por enquanto, o esqueleto gera:
         - 1 medição por measurementId
@@ -66,77 +111,76 @@ class MQTTDeviceSimulator:
           },
           ...
         ]
+
+        A parte fixa de cada medição vem pré-serializada de
+        self._templates; aqui só entram o timestamp do tick e o valor.
         """
-        timestamp_ms = int(time.time() * 1000)
-
-        medicoes = []
-        for measurement_id in self.measurement_ids:
-            # ESQUELETO: valor aleatório simples.
-            # Depois podemos refinar para faixas por tipo de measurementId.
-            valor = random.uniform(-1000.0, 1000.0)
-
-            medicoes.append(
-                {
-                    "timestamp": timestamp_ms,
-                    "deviceId": self.device_id,
-                    "measurementId": measurement_id,
-                    "measurementIndex": 1,  # por enquanto fixo
-                    "value": valor,
-                }
+        ts = str(int(time.time() * 1000)).encode()
+
+        itens = b",".join(
+            b'{"timestamp":' + ts + template
+            # ESQUELETO: valor aleatório simples, vindo do pool NumPy.
+            # repr() de um float finito já é um número JSON válido.
+            + repr(valor).encode() + b"}"
+            for template, valor in zip(
+                self._templates, _proximos_valores(len(self._templates))
             )
-
-        return medicoes
+        )
+        return b"[" + itens + b"]"
 
     def publicar(self):
         """
         Gera um payload e publica no broker MQTT usando o cliente fornecido.
 
-        - Serializa a lista de medições como JSON (string).
-        - Publica no tópico <deviceId>/data.
+        - O payload já sai serializado (bytes) de gerar_payload.
+        - Publica no tópico <deviceId>/data (paho aceita bytes).
         """
-        payload = self.gerar_payload()
-        payload_str = json.dumps(payload)
+        _publicar_com_retries(self.client, self.topic, self.gerar_payload())
 
-        delay = settings.MQTT_PUBLISH_BACKOFF_BASE
-        max_retries = settings.MQTT_PUBLISH_MAX_RETRIES
 
-        for attempt in range(1, max_retries + 1):
-            # Publicação MQTT (QoS 0 por enquanto, fire-and-forget)
-            result = self.client.publish(self.topic, payload_str)
+def _publicar_com_retries(client: mqtt.Client, topic: str, payload: bytes):
+    """
+    Publica um payload com retries e backoff exponencial
+    (sequência pré-computada em _BACKOFFS_PUBLICACAO).
+    """
+    max_retries = len(_BACKOFFS_PUBLICACAO)
 
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                logger.debug("Publicado em %s: %s", self.topic, payload_str)
-                return
+    for attempt, delay in enumerate(_BACKOFFS_PUBLICACAO, start=1):
+        # Publicação MQTT (QoS 0 por enquanto, fire-and-forget)
+        result = client.publish(topic, payload)
 
-            if attempt >= max_retries:
-                logger.error(
-                    "Falha ao publicar em %s após %s tentativas. RC=%s",
-                    self.topic,
-                    attempt,
-                    result.rc,
-                )
-                return
+        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            logger.debug("Publicado em %s: %s", topic, payload)
+            return
 
-            logger.warning(
-                "Erro ao publicar em %s (tentativa %s/%s, RC=%s). Retentando em %.2fs.",
-                self.topic,
+        if attempt >= max_retries:
+            logger.error(
+                "Falha ao publicar em %s após %s tentativas. RC=%s",
+                topic,
                 attempt,
-                max_retries,
                 result.rc,
-                delay,
             )
-            time.sleep(delay)
-            delay *= 2
+            return
+
+        logger.warning(
+            "Erro ao publicar em %s (tentativa %s/%s, RC=%s). Retentando em %.2fs.",
+            topic,
+            attempt,
+            max_retries,
+            result.rc,
+            delay,
+        )
+        time.sleep(delay)
 
 
 def _conectar_com_retries(client: mqtt.Client):
     """
-    Tenta conectar ao broker MQTT com retries e backoff exponencial.
+    Tenta conectar ao broker MQTT com retries e backoff exponencial
+    (sequência pré-computada em _BACKOFFS_CONEXAO).
     """
-    delay = settings.MQTT_CONNECT_BACKOFF_BASE
-    max_retries = settings.MQTT_CONNECT_MAX_RETRIES
+    max_retries = len(_BACKOFFS_CONEXAO)
 
-    for attempt in range(1, max_retries + 1):
+    for attempt, delay in enumerate(_BACKOFFS_CONEXAO, start=1):
         try:
             client.connect(
                 settings.MQTT_BROKER_HOST,
@@ -160,7 +204,6 @@ def _conectar_com_retries(client: mqtt.Client):
                 exc_info=True,
             )
             time.sleep(delay)
-            delay *= 2
 
 
 def criar_cliente_mqtt() -> mqtt.Client:
@@ -234,18 +277,39 @@ def run_simulator():
     dispositivos = criar_dispositivos_simulados(client)
 
     intervalo = settings.SIMULATOR_INTERVAL_SECONDS
+    batch_ticks = settings.SIMULATOR_BATCH_TICKS
+    # O payload canônico é uma lista e carrega o deviceId em cada item,
+    # então as medições de todos os dispositivos podem viajar em uma
+    # única mensagem: 1 publish por rodada (ou por BATCH_TICKS rodadas)
+    # em vez de N — menos framing MQTT, menos callbacks no consumer e
+    # batches maiores chegando ao banco.
+    topico_lote = f"{settings.SIMULATOR_DEVICE_PREFIX}/data"
 
     logger.info(
-        "Iniciando simulador com %s dispositivos, %s measurementIds, intervalo %ss.",
+        "Iniciando simulador com %s dispositivos, %s measurementIds, "
+        "intervalo %ss, lote de %s tick(s).",
         len(dispositivos),
         settings.SIMULATOR_MEASUREMENT_IDS,
         intervalo,
+        batch_ticks,
     )
 
     try:
+        partes: List[bytes] = []
+        ticks = 0
         while True:
             for dispositivo in dispositivos:
-                dispositivo.publicar()
+                # Descarta os colchetes de cada lista individual; o
+                # payload mesclado é remontado em uma lista única.
+                partes.append(dispositivo.gerar_payload()[1:-1])
+
+            ticks += 1
+            if ticks >= batch_ticks:
+                _publicar_com_retries(
+                    client, topico_lote, b"[" + b",".join(partes) + b"]"
+                )
+                partes.clear()
+                ticks = 0
 
             # Aguarda o intervalo definido antes da próxima rodada
             time.sleep(intervalo)
@@ -0,0 +1,24 @@
+"""
+backoff.py
+
+Sequências de backoff exponencial pré-computadas para os loops de retry
+do projeto (conexão MQTT, flush no banco, publicação do simulador).
+
+Em vez de cada loop carregar um 'delay' mutável e recalcular 'delay *= 2'
+a cada iteração, a sequência inteira é calculada uma única vez e os loops
+apenas a percorrem.
+"""
+
+from typing import List
+
+
+def calcular_backoffs(base: float, tentativas: int) -> List[float]:
+    """
+    Retorna a sequência [base, base*2, base*4, ...] com 'tentativas'
+    posições.
+
+    A posição i é a espera após a tentativa i+1 falhar; a última posição
+    nunca chega a ser aguardada (a última tentativa falha sem sleep), mas
+    é mantida para a sequência casar 1:1 com as tentativas.
+    """
+    return [base * (2 ** i) for i in range(tentativas)]
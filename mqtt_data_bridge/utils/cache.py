@@ -0,0 +1,126 @@
+"""
+cache.py
+
+Cache-aside em Redis para os endpoints de leitura da API.
+
+- A API consulta o cache antes de ir ao banco e grava o resultado
+  serializado com TTL curto (cache-aside).
+- O consumer invalida as chaves de leitura após cada flush bem-sucedido,
+  para que dados recém-gravados apareçam sem esperar o TTL.
+- Todo acesso ao Redis é "fail-open": se o servidor estiver fora do ar,
+  a API continua respondendo direto do banco (com log de aviso).
+
+Controlado por settings.CACHE_ENABLED; desabilitado, nenhuma conexão
+Redis é aberta.
+"""
+
+from typing import Optional
+
+import redis
+import redis.asyncio as redis_asyncio
+
+from mqtt_data_bridge.config.settings import settings
+from mqtt_data_bridge.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Prefixos de chave usados pela API. A invalidação apaga por prefixo,
+# então novas rotas cacheadas devem usar um destes (ou ser adicionadas
+# em invalidar_cache_leituras).
+PREFIXO_MEDICOES = "medicoes:"
+CHAVE_DISPOSITIVOS = "dispositivos:all"
+
+
+class RedisCache:
+    """
+    Cliente assíncrono de cache para a API (conexões vêm de um pool).
+    """
+
+    def __init__(self, url: str, max_connections: int = 20):
+        self._pool = redis_asyncio.ConnectionPool.from_url(
+            url, max_connections=max_connections
+        )
+        self._client = redis_asyncio.Redis(connection_pool=self._pool)
+
+    async def obter(self, chave: str) -> Optional[bytes]:
+        """
+        Busca o valor da chave; None em caso de miss ou erro de Redis.
+        """
+        try:
+            return await self._client.get(chave)
+        except redis.RedisError as exc:
+            logger.warning("Cache indisponível (GET %s): %s", chave, exc)
+            return None
+
+    async def definir(self, chave: str, valor: bytes, ttl: int) -> None:
+        """
+        Grava o valor com TTL (segundos). Erros de Redis são só logados.
+        """
+        try:
+            await self._client.setex(chave, ttl, valor)
+        except redis.RedisError as exc:
+            logger.warning("Cache indisponível (SETEX %s): %s", chave, exc)
+
+
+_cache_api: Optional[RedisCache] = None
+
+
+def obter_cache_api() -> Optional[RedisCache]:
+    """
+    Retorna o cache da API (singleton), ou None se o cache está desabilitado.
+    """
+    global _cache_api
+    if not settings.CACHE_ENABLED:
+        return None
+    if _cache_api is None:
+        _cache_api = RedisCache(settings.REDIS_URL)
+    return _cache_api
+
+
+_cliente_invalidacao: Optional[redis.Redis] = None
+
+
+def _obter_cliente_invalidacao() -> redis.Redis:
+    """
+    Cliente síncrono (singleton) usado pela invalidação pós-flush.
+
+    O redis-py mantém pool e reconexão internos, então o cliente é
+    criado uma vez e reutilizado — nada de abrir TCP (+ handshake) a
+    cada flush. Os timeouts de socket são curtos de propósito: com o
+    Redis fora do ar, a thread de flush não pode ficar presa aqui
+    segurando o próximo batch.
+    """
+    global _cliente_invalidacao
+    if _cliente_invalidacao is None:
+        _cliente_invalidacao = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1.0,
+            socket_timeout=1.0,
+        )
+    return _cliente_invalidacao
+
+
+def invalidar_cache_leituras() -> None:
+    """
+    Remove as chaves de leitura de medições após um flush do consumer.
+
+    Usa um cliente síncrono (módulo, reutilizado): o flush roda na
+    thread do consumer MQTT, fora de qualquer event loop. Falhas são só
+    logadas — o flush no banco já aconteceu e não deve ser desfeito por
+    problema de cache.
+
+    CHAVE_DISPOSITIVOS fica de fora de propósito: a lista de
+    dispositivos quase nunca muda e invalidá-la a cada flush reduziria
+    seu TTL de CACHE_TTL_DISPOSITIVOS a um intervalo de flush. Um
+    dispositivo novo aparece na API em até esse TTL.
+    """
+    if not settings.CACHE_ENABLED:
+        return
+
+    try:
+        client = _obter_cliente_invalidacao()
+        chaves = list(client.scan_iter(match=PREFIXO_MEDICOES + "*"))
+        if chaves:
+            client.delete(*chaves)
+    except redis.RedisError as exc:
+        logger.warning("Falha ao invalidar cache após flush: %s", exc)
@@ -8,13 +8,12 @@ Utilitário simples para padronizar logs do projeto.
 - Exponibiliza `get_logger(name)` para uso nos módulos.
 """
 
-import json
 import logging
 from typing import Any, Dict
 
-from mqtt_data_bridge.config.settings import settings
+import orjson
 
-_CONFIGURED = False
+from mqtt_data_bridge.config.settings import settings
 
 
 class JSONFormatter(logging.Formatter):
@@ -31,15 +30,18 @@ class JSONFormatter(logging.Formatter):
         }
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
-        return json.dumps(payload, ensure_ascii=True)
+        # orjson serializa em C direto para bytes (sem o escape ASCII do
+        # json stdlib); default=str cobre valores não-JSON em extras.
+        return orjson.dumps(payload, default=str).decode()
 
 
 def _configure_logging() -> None:
-    global _CONFIGURED
-    if _CONFIGURED:
+    # Idempotente: se o root já tem handler (nosso ou de quem embutiu o
+    # projeto), não reconfigura.
+    root = logging.getLogger()
+    if root.hasHandlers():
         return
 
-    root = logging.getLogger()
     root.setLevel(settings.LOG_LEVEL)
 
     handler = logging.StreamHandler()
@@ -53,17 +55,19 @@ def _configure_logging() -> None:
         )
     handler.setFormatter(formatter)
 
-    # Evita acumular handlers se o módulo for importado várias vezes
-    root.handlers.clear()
     root.addHandler(handler)
 
-    _CONFIGURED = True
-
 
-def get_logger(name: str) -> logging.Logger:
+def get_logger(name: str, _cache: Dict[str, logging.Logger] = {}) -> logging.Logger:
     """
     Retorna um logger configurado.
+
+    O dict de cache (argumento default, criado uma vez) torna chamadas
+    repetidas um único lookup, sem passar pela checagem de configuração
+    nem pelo lock interno de logging.getLogger.
     """
-    if not _CONFIGURED:
+    logger = _cache.get(name)
+    if logger is None:
         _configure_logging()
-    return logging.getLogger(name)
+        logger = _cache.setdefault(name, logging.getLogger(name))
+    return logger
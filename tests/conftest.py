@@ -4,50 +4,182 @@ conftest.py
 Configuração de testes para o projeto mqtt-data-bridge.
 
 Aqui:
-- Criamos um banco SQLite em memória para os testes.
+- Criamos um banco SQLite em memória para os testes (fixture engine,
+  com o schema criado uma única vez por sessão/worker).
 - Reconfiguramos o engine e o SessionLocal do módulo modelagem_banco
   para usar esse banco de teste.
-- Criamos as tabelas antes dos testes rodarem.
+- Oferecemos a fixture db_session: cada teste roda dentro de um
+  SAVEPOINT que é descartado no teardown, então nenhum estado vaza de
+  um teste para o outro e as asserções podem conferir contagens exatas.
 """
 
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-#from mqtt_data_bridge.database import modelagem_banco as db
 from mqtt_data_bridge.database import modelagem_banco as db
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "slow: testes de lote grande, pulados sem --runslow"
+    )
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--runslow",
+        action="store_true",
+        default=False,
+        help="roda também os testes marcados como slow (lotes grandes)",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Por padrão, pula os testes @pytest.mark.slow (casos de lote grande,
+    que existem para flagrar regressões de throughput): o pytest do
+    dia a dia continua rápido e --runslow os reativa.
+    """
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="teste lento: use --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """
+    Engine SQLite em memória da suíte, com o schema criado UMA vez.
+
+    Escopo de sessão: o DDL (CREATE TABLE + índices) — o passo mais
+    caro do startup em suítes pequenas — roda uma única vez por worker,
+    nunca no caminho quente dos testes.
+    """
+
+    # StaticPool mantém UMA conexão sqlite3 viva para a sessão de
+    # testes inteira: sem ela, cada checkout abriria um novo banco em
+    # memória (e perderia o schema). check_same_thread=False deixa a
+    # thread de flush do consumer usar essa mesma conexão nos testes
+    # que a exercitam.
+    eng = create_engine(
+        "sqlite:///:memory:",
+        echo=False,
+        future=True,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    # O driver pysqlite não abre transações de forma confiável para o
+    # uso de SAVEPOINTs; o workaround oficial do SQLAlchemy é desligar
+    # o autocommit do driver e emitir o BEGIN manualmente.
+    @event.listens_for(eng, "connect")
+    def _do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(eng, "begin")
+    def _do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    # Cria as tabelas no banco de teste
+    db.Base.metadata.create_all(eng)
+
+    yield eng
+
+    eng.dispose()
+
+
 @pytest.fixture(scope="session", autouse=True)
-def setup_test_db():
+def setup_test_db(engine):
     """
-    Fixture de sessão de testes que:
+    Aponta o módulo modelagem_banco para o engine de teste.
 
-    - Cria um engine SQLite em memória (sqlite:///:memory:).
-    - Substitui o engine e o SessionLocal do módulo modelagem_banco
-      para apontar para esse engine de teste.
-    - Cria todas as tabelas definidas em Base.metadata.
-    - Garante que todos os testes usem esse banco isolado.
+    O sessionmaker é construído UMA vez para a suíte inteira (é uma
+    fábrica de classe, não algo a recriar por teste):
+    - expire_on_commit=False evita o re-SELECT dos atributos após
+      commit — os testes só conferem contagens;
+    - autoflush=False evita o flush implícito antes de cada consulta.
 
     A opção autouse=True faz com que isso seja aplicado automaticamente
     a todos os testes, sem precisar declarar explicitamente nas funções.
     """
-
-    # Cria um novo engine em memória
-    engine = create_engine("sqlite:///:memory:", echo=False, future=True)
-
-    # Reconfigura o módulo modelagem_banco para usar este engine
     db.engine = engine
     db.SessionLocal = sessionmaker(
         bind=engine,
         autoflush=False,
         autocommit=False,
+        expire_on_commit=False,
     )
 
-    # Cria as tabelas no banco de teste
-    db.Base.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture
+def contar_inserts(engine):
+    """
+    Contador de comandos INSERT enviados ao banco durante o teste.
+
+    Um executemany conta como UM — é exatamente a propriedade que o
+    batch promete: uma ida ao banco por lote, não por linha.
+    """
+    contagem = {"inserts": 0}
+
+    def _ouvinte(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT"):
+            contagem["inserts"] += 1
+
+    event.listen(engine, "before_cursor_execute", _ouvinte)
+    yield contagem
+    event.remove(engine, "before_cursor_execute", _ouvinte)
+
+
+@pytest.fixture(scope="module")
+def conexao_modulo(engine):
+    """
+    Conexão com UMA transação externa para o módulo de testes inteiro.
+
+    A transação nunca é commitada: os testes se isolam apenas com
+    SAVEPOINTs dentro dela, então o par BEGIN/ROLLBACK (e o trabalho de
+    journal do SQLite que o acompanha) é pago uma vez por módulo, não
+    uma vez por caso parametrizado.
+    """
+    conexao = engine.connect()
+    transacao = conexao.begin()
+
+    yield conexao
+
+    transacao.rollback()
+    conexao.close()
+
+
+@pytest.fixture
+def db_session(conexao_modulo):
+    """
+    Sessão isolada por teste, no padrão "joining an external
+    transaction" do SQLAlchemy:
+
+    - abre um SAVEPOINT na transação externa do módulo;
+    - entrega uma Session presa à mesma conexão, em modo
+      create_savepoint: cada commit feito pelo código sob teste vira
+      apenas RELEASE SAVEPOINT, sem tocar a transação externa;
+    - no teardown, o rollback ao SAVEPOINT descarta o que o teste
+      gravou.
+
+    Assim cada teste enxerga o banco vazio, sem recriar schema nem
+    depender da ordem de execução.
+    """
+    savepoint = conexao_modulo.begin_nested()
+    sessao = Session(
+        bind=conexao_modulo,
+        join_transaction_mode="create_savepoint",
+        autoflush=False,
+        expire_on_commit=False,
+    )
 
-    yield
+    yield sessao
 
-    # Finalização (se precisar)
-    engine.dispose()
+    sessao.close()
+    savepoint.rollback()
@@ -2,7 +2,7 @@
 Testes para a função converter_payload_para_medicoes.
 
 Objetivo:
-- Garantir que o JSON correto vira objetos Medicao corretos.
+- Garantir que o JSON correto vira linhas de inserção (dicts) corretas.
 - Garantir que JSON inválido não derruba o fluxo (retorna lista vazia).
 - Garantir que itens inválidos dentro de uma lista não impedem os válidos.
 """
@@ -11,7 +11,6 @@ import json
 from datetime import datetime, timezone
 
 from mqtt_data_bridge.mqtt.consumer import converter_payload_para_medicoes
-from mqtt_data_bridge.database.modelagem_banco import Medicao
 
 def test_converter_payload_medicao_unica_valida():
     # Arrange: payload com uma única medição válida
@@ -32,17 +31,17 @@ def test_converter_payload_medicao_unica_valida():
     # Assert
     assert len(medicoes) == 1
     m = medicoes[0]
-    assert isinstance(m, Medicao)
-    assert m.device_id == "SMA-SIM-DEVICE-001"
-    assert m.measurement_id == "pAcGrid"
-    assert m.measurement_index == 1
-    assert m.value == 123.45
+    assert isinstance(m, dict)
+    assert m["device_id"] == "SMA-SIM-DEVICE-001"
+    assert m["measurement_id"] == "pAcGrid"
+    assert m["measurement_index"] == 1
+    assert m["value"] == 123.45
 
     # Confere se o timestamp foi convertido para datetime com timezone UTC
-    assert isinstance(m.timestamp, datetime)
-    assert m.timestamp.tzinfo is not None
+    assert isinstance(m["timestamp"], datetime)
+    assert m["timestamp"].tzinfo is not None
     # Epoch 1746085310003 ms → checamos só se é maior que 0 (evitar hardcode)
-    assert m.timestamp.timestamp() > 0
+    assert m["timestamp"].timestamp() > 0
 
 
 def test_converter_payload_varias_medicoes_validas():
@@ -67,7 +66,7 @@ def test_converter_payload_varias_medicoes_validas():
     medicoes = converter_payload_para_medicoes(raw_payload)
 
     assert len(medicoes) == 2
-    ids = {(m.measurement_id, m.value) for m in medicoes}
+    ids = {(m["measurement_id"], m["value"]) for m in medicoes}
     assert ("pAcGrid", 100.0) in ids
     assert ("vAcGrid", 230.0) in ids
 
@@ -116,11 +115,11 @@ def test_converter_payload_com_itens_invalidos_na_lista():
 
     medicoes = converter_payload_para_medicoes(raw_payload)
 
-    # Esperado: apenas o item válido vira Medicao
+    # Esperado: apenas o item válido vira linha de inserção
     assert len(medicoes) == 1
     m = medicoes[0]
-    assert m.device_id == "SMA-SIM-DEVICE-002"
-    assert m.value == 200.0
+    assert m["device_id"] == "SMA-SIM-DEVICE-002"
+    assert m["value"] == 200.0
 
 def test_converter_payload_timestamp_zero():
     payload = [
@@ -138,6 +137,6 @@ def test_converter_payload_timestamp_zero():
 
     assert len(medicoes) == 1
     m = medicoes[0]
-    assert isinstance(m.timestamp, datetime)
+    assert isinstance(m["timestamp"], datetime)
     # Epoch 0 em UTC:
-    assert m.timestamp == datetime.fromtimestamp(0, tz=timezone.utc)
+    assert m["timestamp"] == datetime.fromtimestamp(0, tz=timezone.utc)
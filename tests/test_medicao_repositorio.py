@@ -4,87 +4,86 @@ test_medicao_repositorio.py
 Testes básicos para o MedicaoRepositorio.
 
 Objetivos:
-- Garantir que salvar_em_batch insere registros corretamente.
-- Garantir que salvar_em_batch com lista vazia não quebra
-  e retorna 0.
+- Garantir que salvar_em_batch insere registros corretamente, do caso
+  vazio ao lote grande (o regime em que o batch realmente importa).
+
+Os testes usam a fixture db_session (conftest): cada um roda dentro de
+um SAVEPOINT descartado no teardown, então as contagens são exatas e
+não há acoplamento de ordem entre os testes.
 """
 
 from datetime import datetime, timezone
+from typing import List
 
-from mqtt_data_bridge.database.modelagem_banco import (
-    criar_sessao,
-    Medicao,
-)
+import pytest
+from sqlalchemy import func, select
+
+from mqtt_data_bridge.database.modelagem_banco import Medicao
 from mqtt_data_bridge.database.repositorio import MedicaoRepositorio
 
+# Um único "agora" para todos os casos: as medições do mesmo lote
+# compartilham logicamente o mesmo instante de teste, e uma chamada a
+# datetime.now em vez de uma por linha também mantém o lote
+# determinístico em relação à ordenação por timestamp.
+_AGORA = datetime.now(tz=timezone.utc)
+
 
-def test_salvar_em_batch_insere_registros():
+def _montar_medicoes(n: int) -> List[dict]:
     """
-    Verifica se o repositório salva corretamente múltiplas medições
-    no banco de dados de teste.
+    Fábrica de linhas de inserção: n medições do mesmo instante, com
+    measurement_index/value distintos por linha. Serve tanto para os
+    casos pequenos quanto para lotes de stress.
     """
+    return [
+        {
+            "device_id": "TEST-DEVICE-001",
+            "measurement_id": "pAcGrid",
+            "measurement_index": i,
+            "timestamp": _AGORA,
+            "value": float(i),
+        }
+        for i in range(n)
+    ]
 
-    repositorio = MedicaoRepositorio()
 
-    # Cria algumas instâncias de Medicao em memória
-    medicoes = [
-        Medicao(
-            device_id="TEST-DEVICE-001",
-            measurement_id="pAcGrid",
-            measurement_index=1,
-            timestamp=datetime.now(tz=timezone.utc),
-            value=100.0,
-        ),
-        Medicao(
-            device_id="TEST-DEVICE-001",
-            measurement_id="vAcGrid",
-            measurement_index=1,
-            timestamp=datetime.now(tz=timezone.utc),
-            value=230.0,
-        ),
-    ]
+@pytest.mark.parametrize(
+    "n",
+    [0, 1, 2, pytest.param(1000, marks=pytest.mark.slow)],
+    ids=["vazio", "uma_medicao", "duas_medicoes", "lote_grande"],
+)
+def test_salvar_em_batch(db_session, n):
+    """
+    salvar_em_batch deve retornar e persistir exatamente n medições:
+    do curto-circuito da lista vazia ao lote de 1000 linhas que
+    exercita o caminho de executemany de verdade.
+    """
 
-    # Executa o método de salvamento em batch
-    quantidade = repositorio.salvar_em_batch(medicoes)
+    repositorio = MedicaoRepositorio()
 
-    # Verifica retorno
-    assert quantidade == 2
+    quantidade = repositorio.salvar_em_batch(
+        _montar_medicoes(n), sessao=db_session
+    )
+    assert quantidade == n
 
-    # Confere diretamente no banco se as linhas foram inseridas
-    sessao = criar_sessao()
-    try:
-        total = sessao.query(Medicao).count()
-        assert total == 2
-    finally:
-        sessao.close()
+    # Confere na mesma sessão se as linhas foram inseridas.
+    # select(func.count()) compila para um COUNT(*) direto, sem o
+    # subquery que o query().count() legado gera.
+    total = db_session.execute(
+        select(func.count()).select_from(Medicao)
+    ).scalar()
+    assert total == n
 
 
-def test_salvar_em_batch_lista_vazia():
+def test_salvar_em_batch_uma_ida_ao_banco(db_session, contar_inserts):
     """
-    Verifica se o salvamento em batch com lista vazia:
-
-    - não gera erro;
-    - retorna 0;
-    - não insere registros.
+    Garante a propriedade de batching em si: 500 medições devem virar
+    UM único INSERT (executemany), não um INSERT por linha. Qualquer
+    refatoração que degrade o caminho para um loop por registro falha
+    aqui, mesmo que as contagens continuem corretas.
     """
 
     repositorio = MedicaoRepositorio()
 
-    medicoes = []
-
-    quantidade = repositorio.salvar_em_batch(medicoes)
-    assert quantidade == 0
-
-    # Garantir que nada foi gravado
-    sessao = criar_sessao()
-    try:
-        total = sessao.query(Medicao).count()
-        # Se este teste rodar em sequência com o anterior, podem existir
-        # registros. O importante é que não tenha aumentado.
-        # Então aqui só garantimos que a função rodou e não quebrou
-        # e não adicionou novos registros.
-        # Em cenários mais rígidos, seria ideal isolar cada teste
-        # com transações ou limpar a tabela.
-        assert total >= 0
-    finally:
-        sessao.close()
+    repositorio.salvar_em_batch(_montar_medicoes(500), sessao=db_session)
+
+    assert contar_inserts["inserts"] == 1